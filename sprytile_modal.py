@@ -1,4 +1,5 @@
 import math
+import time
 from collections import deque
 
 import bmesh
@@ -19,6 +20,17 @@ import sprytile_utils
 import sprytile_preview
 
 
+# Read-only axis vectors, shared to avoid re-allocating them in
+# per-event and per-tick code paths
+VECTOR_UP = Vector((0.0, 1.0, 0.0))
+VECTOR_RIGHT = Vector((1.0, 0.0, 0.0))
+VECTOR_FORWARD = Vector((0.0, 0.0, -1.0))
+
+# Minimum time between mouse-move tool dispatches. Mouse events can
+# arrive far faster than tools can usefully raycast and build
+MOUSEMOVE_BUDGET = 1.0 / 60.0
+
+
 class DataObjectDict(dict):
     def __getattr__(self, name):
         if name in self:
@@ -54,31 +66,50 @@ class VIEW3D_OP_SprytileModalTool(bpy.types.Operator):
 
     draw_preview = False
 
+    # Cache of snapped view axis results, keyed by quantized view
+    # rotation. There are only 24 possible outputs, and the camera is
+    # not orbiting on most of the timer ticks that ask for this
+    _axis_cache = {}
+
     @staticmethod
     def calculate_view_axis(context):
         if context.area.type != 'VIEW_3D':
             return None, None
 
-        region = context.region
         rv3d = context.region_data
         if rv3d is None:
             return None, None
 
-        # Get the view ray from center of screen
-        coord = Vector((int(region.width / 2), int(region.height / 2)))
-        view_vector = view3d_utils.region_2d_to_vector_3d(region, rv3d, coord)
+        # Coarse quantization, snapping already absorbs small jitter
+        cache = VIEW3D_OP_SprytileModalTool._axis_cache
+        cache_key = tuple(round(el, 2) for el in rv3d.view_rotation)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            plane_normal, up_vector = cached
+            if plane_normal is None:
+                return None, None
+            return Vector(plane_normal), Vector(up_vector)
+
+        # The view ray through the center of the screen is just the view
+        # forward axis, no need to unproject a screen coordinate for it
+        view_vector = rv3d.view_rotation @ VECTOR_FORWARD
 
         # Get the up vector. The default scene view camera is pointed
         # downward, with up on Y axis. Apply view rotation to get current up
-        view_up_vector = rv3d.view_rotation @ Vector((0.0, 1.0, 0.0))
+        view_up_vector = rv3d.view_rotation @ VECTOR_UP
 
         plane_normal = sprytile_utils.snap_vector_to_axis(view_vector, mirrored=True)
         up_vector = sprytile_utils.snap_vector_to_axis(view_up_vector)
 
+        if len(cache) >= 256:
+            cache.clear()
+
         # calculated vectors are not perpendicular, don't set data
         if plane_normal.dot(up_vector) != 0.0:
+            cache[cache_key] = (None, None)
             return None, None
 
+        cache[cache_key] = (plane_normal.to_tuple(), up_vector.to_tuple())
         return plane_normal, up_vector
 
     @staticmethod
@@ -155,19 +186,18 @@ class VIEW3D_OP_SprytileModalTool(bpy.types.Operator):
 
         last_pos = self.virtual_cursor[cursor_len - 1]
         last_vector = cursor_pos - last_pos
-        if last_vector.magnitude < 0.1:
+        # Squared comparison, saves a sqrt per mouse move
+        if last_vector.length_squared < 0.01:
             return
 
         self.virtual_cursor.append(cursor_pos)
 
     def get_virtual_cursor_vector(self):
-        cursor_direction = Vector((0.0, 0.0, 0.0))
         cursor_len = len(self.virtual_cursor)
         if cursor_len <= 1:
-            return cursor_direction
-        for idx in range(cursor_len - 1):
-            segment = self.virtual_cursor[idx + 1] - self.virtual_cursor[idx]
-            cursor_direction += segment
+            return Vector((0.0, 0.0, 0.0))
+        # The summed segments telescope down to last minus first
+        cursor_direction = self.virtual_cursor[-1] - self.virtual_cursor[0]
         cursor_direction /= cursor_len
         return cursor_direction
 
@@ -194,17 +224,20 @@ class VIEW3D_OP_SprytileModalTool(bpy.types.Operator):
         cursor_direction = self.get_virtual_cursor_vector()
         cursor_direction.normalize()
 
-        max_dist = -1.0
+        max_dist_sqr = -1.0
         closest_pos = None
 
-        for idx, vert in enumerate(verts):
+        # cursor_direction is unit length, so the old normalized-dot
+        # threshold dot > 0.5 is equivalent to dot > 0.5 * |v|; square
+        # both sides to avoid a sqrt and a normalize per vert
+        for vert in verts:
             vert_vector = vert - virtual_cursor
-            vert_dist = vert_vector.length
-            vert_vector.normalize()
+            vert_dist_sqr = vert_vector.length_squared
             vert_dot = vert_vector.dot(cursor_direction)
-            if vert_dot > 0.5 and vert_dist > max_dist:
+            if vert_dot > 0 and (vert_dot * vert_dot) > (0.25 * vert_dist_sqr) \
+                    and vert_dist_sqr > max_dist_sqr:
                 closest_pos = vert
-                max_dist = vert_dist
+                max_dist_sqr = vert_dist_sqr
 
         return closest_pos
 
@@ -222,7 +255,7 @@ class VIEW3D_OP_SprytileModalTool(bpy.types.Operator):
         """
         obj = context.object
 
-        ray_origin = Vector(context.scene.cursor.location.copy())
+        ray_origin = context.scene.cursor.location.copy()
         ray_origin += (x + 0.5) * right_vector
         ray_origin += (y + 0.5) * up_vector
 
@@ -231,52 +264,78 @@ class VIEW3D_OP_SprytileModalTool(bpy.types.Operator):
 
         ray_direction = -normal
 
+        # Reuse the modal BVH tree unless a build left it out of date
+        tree = self.tree if self._tree_dirty is False else None
         return VIEW3D_OP_SprytileModalTool.raycast_object(obj, ray_origin, ray_direction, ray_dist=ray_offset*2,
-                                   work_layer_mask=work_layer_mask)
+                                   work_layer_mask=work_layer_mask, tree=tree)
+
+    # Last inverted world matrix, keyed by object name. Raycasts happen
+    # far more often than the object transform changes
+    _matrix_cache = None
 
     @staticmethod
-    def raycast_object(obj, ray_origin, ray_direction, ray_dist=1000.0,
-                       world_normal=False, work_layer_mask=0, pass_dist=0.001):
+    def get_object_matrices(obj):
+        """Get the world matrix and its inverse, cached between calls"""
+        cache = VIEW3D_OP_SprytileModalTool._matrix_cache
+        if cache is not None and cache[0] == obj.name and cache[1] == obj.matrix_world:
+            return cache[1], cache[2]
         matrix = obj.matrix_world.copy()
-        # get the ray relative to the object
         matrix_inv = matrix.inverted()
-        ray_origin_obj = matrix_inv @ ray_origin
-        ray_target_obj = matrix_inv @ (ray_origin + ray_direction)
-        ray_direction_obj = ray_target_obj - ray_origin_obj
-        mesh = bmesh.from_edit_mesh(obj.data)
-        tree = BVHTree.FromBMesh(mesh)
+        VIEW3D_OP_SprytileModalTool._matrix_cache = (obj.name, matrix, matrix_inv)
+        return matrix, matrix_inv
 
-        location, normal, face_index, distance = tree.ray_cast(ray_origin_obj, ray_direction_obj, ray_dist)
-        if face_index is None:
-            return None, None, None, None
-
-        face = mesh.faces[face_index]
+    @staticmethod
+    def raycast_object(obj, ray_origin, ray_direction, ray_dist=1000.0,
+                       world_normal=False, work_layer_mask=0, pass_dist=0.001,
+                       tree=None):
+        matrix, matrix_inv = VIEW3D_OP_SprytileModalTool.get_object_matrices(obj)
+        mesh = bmesh.from_edit_mesh(obj.data)
+        if tree is None:
+            tree = BVHTree.FromBMesh(mesh)
 
         work_layer_id = mesh.faces.layers.int.get(UvDataLayers.WORK_LAYER)
         if work_layer_id is None:
             return None, None, None, None
-        work_layer_value = face[work_layer_id]
 
-        # Pass through faces under certain conditions
-        do_pass_through = False
-        # Layer mask not matching
-        if work_layer_value != work_layer_mask:
-            do_pass_through = True
-        # Hit face is backface
-        if face.normal.dot(ray_direction) > 0:
-            do_pass_through = not bpy.context.scene.sprytile_data.allow_backface
-        # Hit face is hidden
-        if face.hide:
-            do_pass_through = True
-
-        # Translate location back to world space
-        location = matrix @ location
-
-        if do_pass_through:
+        allow_backface = bpy.context.scene.sprytile_data.allow_backface
+        shift_vec = ray_direction.normalized() * pass_dist
+
+        # Cast until a face passes the filters, shifting the ray origin
+        # past rejected faces. Iterating here keeps the mesh wrap, layer
+        # lookup, matrices and tree shared across all the casts
+        while True:
+            # get the ray relative to the object
+            ray_origin_obj = matrix_inv @ ray_origin
+            ray_target_obj = matrix_inv @ (ray_origin + ray_direction)
+            ray_direction_obj = ray_target_obj - ray_origin_obj
+
+            location, normal, face_index, distance = tree.ray_cast(ray_origin_obj, ray_direction_obj, ray_dist)
+            if face_index is None:
+                return None, None, None, None
+
+            face = mesh.faces[face_index]
+
+            # Pass through faces under certain conditions
+            do_pass_through = False
+            # Layer mask not matching
+            if face[work_layer_id] != work_layer_mask:
+                do_pass_through = True
+            # Hit face is backface
+            if face.normal.dot(ray_direction) > 0:
+                do_pass_through = not allow_backface
+            # Hit face is hidden
+            if face.hide:
+                do_pass_through = True
+
+            # Translate location back to world space
+            location = matrix @ location
+
+            if do_pass_through is False:
+                break
+
             # add shift offset if passing through
-            shift_vec = ray_direction.normalized() * pass_dist
-            new_ray_origin = location + shift_vec
-            return VIEW3D_OP_SprytileModalTool.raycast_object(obj, new_ray_origin, ray_direction, work_layer_mask=work_layer_mask)
+            ray_origin = location + shift_vec
+            ray_dist = 1000.0
 
         if world_normal:
             normal = matrix @ normal
@@ -288,7 +347,14 @@ class VIEW3D_OP_SprytileModalTool(bpy.types.Operator):
             # Verify layers are created
             VIEW3D_OP_SprytileModalTool.verify_bmesh_layers(self.bmesh)
             self.bmesh = bmesh.from_edit_mesh(context.object.data)
-        self.tree = BVHTree.FromBMesh(self.bmesh)
+        # Rebuilding the BVH tree is O(faces), only pay for it when the
+        # mesh actually changed. Vertex-only edits (translate, undo) set
+        # the dirty flag instead, since counts alone can't catch them
+        tree_key = (len(self.bmesh.faces), len(self.bmesh.verts))
+        if self.tree is None or self._tree_dirty or tree_key != self._tree_key:
+            self.tree = BVHTree.FromBMesh(self.bmesh)
+            self._tree_key = tree_key
+            self._tree_dirty = False
 
 
     @staticmethod
@@ -374,14 +440,11 @@ class VIEW3D_OP_SprytileModalTool(bpy.types.Operator):
 
         # Didn't create face, only want to remap face. Check for coplanarity and dot
         if did_build is False:
-            check_dot = abs(plane_normal.dot(hit_normal))
-            check_dot -= 1
-            check_coplanar = distance_point_to_plane(hit_loc, grid_origin, plane_normal)
-
-            check_coplanar = abs(check_coplanar) < 0.05
-            check_dot = abs(check_dot) < 0.05
-            # Can't remap face
-            if not check_coplanar or not check_dot:
+            # Cheap normal alignment test first, skip the plane distance
+            # when the face can't be remapped anyway
+            if abs(abs(plane_normal.dot(hit_normal)) - 1) >= 0.05:
+                return None
+            if abs(distance_point_to_plane(hit_loc, grid_origin, plane_normal)) >= 0.05:
                 return None
 
         sprytile_uv.uv_map_face(context, up_vector, right_vector,
@@ -430,12 +493,27 @@ class VIEW3D_OP_SprytileModalTool(bpy.types.Operator):
             context.object,
             ray_origin,
             ray_direction,
-            0.02
+            0.02,
+            tree=self.tree
         )
         if new_face_idx is not None:
             self.bmesh.faces[new_face_idx].select = False
         return new_face_idx
 
+    def find_coincident_vert(self, co, threshold=1e-5):
+        """Find an existing vert in the bmesh coincident with the given
+        object space position, using the BVH tree to keep the search local"""
+        if self.tree is None or self._tree_dirty:
+            return None
+        location, normal, face_index, distance = self.tree.find_nearest(co, threshold * 2)
+        if face_index is None or face_index >= len(self.bmesh.faces):
+            return None
+        threshold_sqr = threshold * threshold
+        for vert in self.bmesh.faces[face_index].verts:
+            if (vert.co - co).length_squared < threshold_sqr:
+                return vert
+        return None
+
     def create_face(self, context, world_vertices):
         """
         Create a face in the bmesh using the given world space vertices
@@ -443,14 +521,26 @@ class VIEW3D_OP_SprytileModalTool(bpy.types.Operator):
         :param world_vertices: Vector array of world space positions
         :return:
         """
+        # When auto merge is on, reuse existing verts that coincide with
+        # the new corners instead of stacking doubles for remove_doubles
+        # to collapse later
+        do_merge_verts = context.scene.sprytile_data.auto_merge
+
         face_vertices = []
         # Convert world space position to object space
-        world_inv = context.object.matrix_world.copy().inverted()
+        world_inv = VIEW3D_OP_SprytileModalTool.get_object_matrices(context.object)[1]
         for face_vtx in world_vertices:
-            vtx = self.bmesh.verts.new(face_vtx)
-            vtx.co = world_inv @ vtx.co
+            vtx_co = world_inv @ face_vtx
+            vtx = self.find_coincident_vert(vtx_co) if do_merge_verts else None
+            if vtx is None:
+                vtx = self.bmesh.verts.new(vtx_co)
             face_vertices.append(vtx)
 
+        # Every corner resolved to an existing vert, the face may too
+        face = self.bmesh.faces.get(face_vertices)
+        if face is not None:
+            return face.index
+
         face = self.bmesh.faces.new(face_vertices)
         face.normal_update()
 
@@ -462,6 +552,7 @@ class VIEW3D_OP_SprytileModalTool(bpy.types.Operator):
 
         # Update the collision BVHTree with new data
         self.refresh_mesh = True
+        self._tree_dirty = True
         return face.index
 
     @staticmethod
@@ -478,8 +569,8 @@ class VIEW3D_OP_SprytileModalTool(bpy.types.Operator):
         # downward, with up on Y axis. Apply view rotation to get current up
 
         rv3d = context.region_data
-        view_up_vector = rv3d.view_rotation @ Vector((0.0, 1.0, 0.0))
-        view_right_vector = rv3d.view_rotation @ Vector((1.0, 0.0, 0.0))
+        view_up_vector = rv3d.view_rotation @ VECTOR_UP
+        view_right_vector = rv3d.view_rotation @ VECTOR_RIGHT
         data = context.scene.sprytile_data
         mesh = bmesh.from_edit_mesh(obj.data)
 
@@ -597,10 +688,14 @@ class VIEW3D_OP_SprytileModalTool(bpy.types.Operator):
         do_exit = False
         sprytile_data = context.scene.sprytile_data
 
-        # Check that the mouse is inside the region
+        # Fetch the region data once for the whole event
         region = context.region
-        coord = Vector((event.mouse_region_x, event.mouse_region_y))
-        out_of_region = coord.x < 0 or coord.y < 0 or coord.x > region.width or coord.y > region.height
+        rv3d = context.region_data
+
+        # Check that the mouse is inside the region
+        mouse_x = event.mouse_region_x
+        mouse_y = event.mouse_region_y
+        out_of_region = mouse_x < 0 or mouse_y < 0 or mouse_x > region.width or mouse_y > region.height
 
         if event.type == 'LEFTMOUSE' and event.value == 'RELEASE':
             do_exit = True
@@ -629,6 +724,9 @@ class VIEW3D_OP_SprytileModalTool(bpy.types.Operator):
         #if self.refresh_mesh or self.bmesh.is_valid is False or draw_preview:
         # @Blender 2.8 note: this now happens inside the GUI operator so no need to do it here
         if self.refresh_mesh or self.bmesh.is_valid is False:
+            if self.bmesh.is_valid is False:
+                # Undo can change geometry without changing element counts
+                self._tree_dirty = True
             self.update_bmesh_tree(context, True)
             self.refresh_mesh = False
 
@@ -670,9 +768,7 @@ class VIEW3D_OP_SprytileModalTool(bpy.types.Operator):
             sprytile_preview.preview_uvs = None
 
         # Build the data that will be used by tool observers
-        region = context.region
-        rv3d = context.region_data
-        coord = event.mouse_region_x, event.mouse_region_y
+        coord = mouse_x, mouse_y
         no_data = self.tree is None or rv3d is None
 
         if no_data is False:
@@ -687,6 +783,14 @@ class VIEW3D_OP_SprytileModalTool(bpy.types.Operator):
         else:
             self.rx_data = None
 
+        # Throttle pure mouse-move dispatches to the frame budget,
+        # presses/releases always go through
+        if event.type == 'MOUSEMOVE':
+            now = time.perf_counter()
+            if now - self._last_dispatch_time < MOUSEMOVE_BUDGET:
+                return modal_return
+            self._last_dispatch_time = now
+
         self.call_tool(event, True, context)
 
         return modal_return
@@ -736,6 +840,8 @@ class VIEW3D_OP_SprytileModalTool(bpy.types.Operator):
             if event.type in clear_types and event.value == 'RELEASE':
                 print("Clearing no undo")
                 self.refresh_mesh = True
+                # Translate may have moved verts, force a BVH rebuild
+                self._tree_dirty = True
                 VIEW3D_OP_SprytileModalTool.no_undo = False
             return {'PASS_THROUGH'} if VIEW3D_OP_SprytileModalTool.no_undo else {'RUNNING_MODAL'}
         elif event.type == 'LEFTMOUSE':
@@ -830,6 +936,10 @@ class VIEW3D_OP_SprytileModalTool(bpy.types.Operator):
 
         self.virtual_cursor = deque([], 3)
         VIEW3D_OP_SprytileModalTool.no_undo = False
+        self.tree = None
+        self._tree_key = None
+        self._tree_dirty = False
+        self._last_dispatch_time = 0.0
         self.update_bmesh_tree(context)
         self.refresh_mesh = False
 
@@ -872,23 +982,26 @@ class VIEW3D_OP_SprytileModalTool(bpy.types.Operator):
     def setup_rx_observer(self, observer):
         self.rx_observer = observer
 
+    # Keyboard event types, as a frozenset so the per-event membership
+    # tests in handle_keys/handle_mouse are hash lookups, not list scans
+    is_keyboard_list = frozenset([
+        'A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M', 'N', 'O', 'P', 'Q',
+        'R', 'S', 'T', 'U', 'V', 'W', 'X', 'Y', 'Z',
+        'ZERO', 'ONE', 'TWO', 'THREE', 'FOUR', 'FIVE', 'SIX', 'SEVEN', 'EIGHT', 'NINE',
+        'LEFT_CTRL', 'LEFT_ALT', 'LEFT_SHIFT', 'RIGHT_ALT',
+        'RIGHT_CTRL', 'RIGHT_SHIFT', 'OSKEY', 'GRLESS', 'ESC', 'TAB', 'RET', 'SPACE',
+        'LINE_FEED', 'BACK_SPACE', 'DEL', 'SEMI_COLON', 'PERIOD', 'COMMA', 'QUOTE',
+        'ACCENT_GRAVE', 'MINUS', 'SLASH', 'BACK_SLASH', 'EQUAL', 'LEFT_BRACKET',
+        'RIGHT_BRACKET', 'LEFT_ARROW', 'DOWN_ARROW', 'RIGHT_ARROW', 'UP_ARROW',
+        'NUMPAD_2', 'NUMPAD_4', 'NUMPAD_6', 'NUMPAD_8', 'NUMPAD_1', 'NUMPAD_3', 'NUMPAD_5',
+        'NUMPAD_7', 'NUMPAD_9', 'NUMPAD_PERIOD', 'NUMPAD_SLASH', 'NUMPAD_ASTERIX', 'NUMPAD_0',
+        'NUMPAD_MINUS', 'NUMPAD_ENTER', 'NUMPAD_PLUS',
+        'F1', 'F2', 'F3', 'F4', 'F5', 'F6', 'F7', 'F8', 'F9', 'F10', 'F11', 'F12', 'F13',
+        'F14', 'F15', 'F16', 'F17', 'F18', 'F19', 'PAUSE', 'INSERT', 'HOME', 'PAGE_UP',
+        'PAGE_DOWN', 'END', 'MEDIA_PLAY', 'MEDIA_STOP', 'MEDIA_FIRST', 'MEDIA_LAST'])
+
     def setup_user_keys(self, context):
         """Find the keymaps to pass through to Blender"""
-        self.is_keyboard_list = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M', 'N', 'O', 'P', 'Q',
-                                 'R', 'S', 'T', 'U', 'V', 'W', 'X', 'Y', 'Z',
-                                 'ZERO', 'ONE', 'TWO', 'THREE', 'FOUR', 'FIVE', 'SIX', 'SEVEN', 'EIGHT', 'NINE',
-                                 'LEFT_CTRL', 'LEFT_ALT', 'LEFT_SHIFT', 'RIGHT_ALT',
-                                 'RIGHT_CTRL', 'RIGHT_SHIFT', 'OSKEY', 'GRLESS', 'ESC', 'TAB', 'RET', 'SPACE',
-                                 'LINE_FEED', 'BACK_SPACE', 'DEL', 'SEMI_COLON', 'PERIOD', 'COMMA', 'QUOTE',
-                                 'ACCENT_GRAVE', 'MINUS', 'SLASH', 'BACK_SLASH', 'EQUAL', 'LEFT_BRACKET',
-                                 'RIGHT_BRACKET', 'LEFT_ARROW', 'DOWN_ARROW', 'RIGHT_ARROW', 'UP_ARROW',
-                                 'NUMPAD_2', 'NUMPAD_4', 'NUMPAD_6', 'NUMPAD_8', 'NUMPAD_1', 'NUMPAD_3', 'NUMPAD_5',
-                                 'NUMPAD_7', 'NUMPAD_9', 'NUMPAD_PERIOD', 'NUMPAD_SLASH', 'NUMPAD_ASTERIX', 'NUMPAD_0',
-                                 'NUMPAD_MINUS', 'NUMPAD_ENTER', 'NUMPAD_PLUS',
-                                 'F1', 'F2', 'F3', 'F4', 'F5', 'F6', 'F7', 'F8', 'F9', 'F10', 'F11', 'F12', 'F13',
-                                 'F14', 'F15', 'F16', 'F17', 'F18', 'F19', 'PAUSE', 'INSERT', 'HOME', 'PAGE_UP',
-                                 'PAGE_DOWN', 'END', 'MEDIA_PLAY', 'MEDIA_STOP', 'MEDIA_FIRST', 'MEDIA_LAST']
-
         self.intercept_keys = []
 
         user_keymaps = context.window_manager.keyconfigs.user.keymaps
@@ -61,7 +61,8 @@ class ToolBuild:
 
             location, hit_normal, face_index, distance = self.modal.raycast_object(context.object,
                                                                                    ray_origin,
-                                                                                   ray_vector)
+                                                                                   ray_vector,
+                                                                                   tree=self.modal.tree)
             if hit_normal is not None:
                 face_up, face_right = VIEW3D_OP_SprytileModalTool.get_face_up_vector(context, face_index, 0.4, bias_right=True)
                 if face_up is not None and face_right is not None:
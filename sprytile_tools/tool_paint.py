@@ -43,7 +43,7 @@ class ToolPaint:
         #    self.build_preview(context, scene, ray_origin, ray_vector)
 
     @staticmethod
-    def process_preview(context, scene, face_index):
+    def process_preview(context, scene, face_index, mesh=None):
         obj = context.object
         data = scene.sprytile_data
 
@@ -60,7 +60,8 @@ class ToolPaint:
         up_vector, right_vector, plane_normal = sprytile_utils.get_current_grid_vectors(scene, False)
 
         face_verts = []
-        mesh = bmesh.from_edit_mesh(context.object.data)
+        if mesh is None:
+            mesh = bmesh.from_edit_mesh(context.object.data)
 
         face = mesh.faces[face_index]
         for loop in face.loops:
@@ -124,14 +125,16 @@ class ToolPaint:
         # Get the work layer filter, based on layer settings
         work_layer_mask = sprytile_utils.get_work_layer_data(scene.sprytile_data)
         hit_loc, hit_normal, face_index, hit_dist = self.modal.raycast_object(obj, ray_origin, ray_vector,
-                                                                              work_layer_mask=work_layer_mask)
+                                                                              work_layer_mask=work_layer_mask,
+                                                                              tree=self.modal.tree)
         if hit_loc is None:
             return
 
         face, verts, uvs, target_grid, data, target_img, tile_xy = ToolPaint.process_preview(
                                                                         context,
                                                                         scene,
-                                                                        face_index)
+                                                                        face_index,
+                                                                        mesh=self.modal.bmesh)
         if face is None:
             return
 
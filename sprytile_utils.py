@@ -3,6 +3,7 @@ import bgl
 import blf
 import bmesh
 import math
+import numpy
 
 import sys
 from bpy_extras import view3d_utils
@@ -119,43 +120,39 @@ def get_grid_selection_ids(context, grid):
 
 def snap_vector_to_axis(vector, mirrored=False):
     """Snaps a vector to the closest world axis"""
-    norm_vector = vector.normalized()
-
-    x = Vector((1.0, 0.0, 0.0))
-    y = Vector((0.0, 1.0, 0.0))
-    z = Vector((0.0, 0.0, 1.0))
-
-    x_dot = 1 - abs(norm_vector.dot(x))
-    y_dot = 1 - abs(norm_vector.dot(y))
-    z_dot = 1 - abs(norm_vector.dot(z))
-    dot_array = [x_dot, y_dot, z_dot]
-    closest = min(dot_array)
-
-    if closest is dot_array[0]:
-        snapped_vector = x
-    elif closest is dot_array[1]:
-        snapped_vector = y
+    # The closest axis is simply the component with the largest
+    # magnitude, invariant under scaling so no need to normalize
+    abs_x = abs(vector.x)
+    abs_y = abs(vector.y)
+    abs_z = abs(vector.z)
+    if abs_x >= abs_y and abs_x >= abs_z:
+        axis = 0
+        component = vector.x
+    elif abs_y >= abs_z:
+        axis = 1
+        component = vector.y
     else:
-        snapped_vector = z
+        axis = 2
+        component = vector.z
 
-    vector_dot = norm_vector.dot(snapped_vector)
-    if mirrored is False and vector_dot < 0:
-        snapped_vector *= -1
-    elif mirrored is True and vector_dot > 0:
-        snapped_vector *= -1
+    sign = -1.0 if (component < 0) != mirrored else 1.0
 
+    snapped_vector = Vector((0.0, 0.0, 0.0))
+    snapped_vector[axis] = sign
     return snapped_vector
 
 
 def get_grid_pos(position, grid_center, right_vector, up_vector, world_pixels, grid_x, grid_y, as_coord=False):
     """Snaps a world position to the given grid settings"""
     position_vector = position - grid_center
-    pos_vector_normalized = position.normalized()
 
     if not as_coord:
-        if right_vector.dot(pos_vector_normalized) < 0:
+        # Only the sign of the dot matters, no need to normalize. This
+        # also tests against the position relative to the grid center;
+        # the old code normalized the raw world position by mistake
+        if right_vector.dot(position_vector) < 0:
             right_vector *= -1
-        if up_vector.dot(pos_vector_normalized) < 0:
+        if up_vector.dot(position_vector) < 0:
             up_vector *= -1
 
     x_magnitude = position_vector.dot(right_vector)
@@ -577,12 +574,11 @@ class UTIL_OP_SprytileAxisUpdate(bpy.types.Operator):
     def invoke(self, context, event):
         # Given the normal mode, find the direction of paint_normal_vector, paint_up_vector
         data = context.scene.sprytile_data
-        region = context.region
         rv3d = context.region_data
 
-        # Get the view ray from center of screen
-        coord = Vector((int(region.width / 2), int(region.height / 2)))
-        view_vector = view3d_utils.region_2d_to_vector_3d(region, rv3d, coord)
+        # The view ray through the center of the screen is just the view
+        # forward axis, no need to unproject a screen coordinate for it
+        view_vector = rv3d.view_rotation @ Vector((0.0, 0.0, -1.0))
 
         # Get the up vector. The default scene view camera is pointed
         # downward, with up on Y axis. Apply view rotation to get current up
@@ -1642,7 +1638,8 @@ class UTIL_OP_SprytileSnapCursor(bpy.types.Operator):
             # Get if user is holding down tile picker modifier
             check_modifier = event.alt
 
-            location, normal, face_index, distance = sprytile_modal.VIEW3D_OP_SprytileModalTool.raycast_object(context.object, ray_origin, ray_vector)
+            location, normal, face_index, distance = sprytile_modal.VIEW3D_OP_SprytileModalTool.raycast_object(context.object, ray_origin, ray_vector,
+                                                                                                              tree=self.tree)
             if location is None:
                 if check_modifier:
                    scene.sprytile_data.lock_normal = False
@@ -1661,17 +1658,15 @@ class UTIL_OP_SprytileSnapCursor(bpy.types.Operator):
             if face_index >= len(self.bmesh.faces) or face_index < 0:
                 return
             face = self.bmesh.faces[face_index]
-            closest_vtx = -1
-            closest_dist = float('inf')
-            # positions are in object space
-            for vtx_idx, vertex in enumerate(face.verts):
-                test_dist = (location - vertex.co).magnitude
-                if test_dist < closest_dist:
-                    closest_vtx = vtx_idx
-                    closest_dist = test_dist
+            # positions are in object space, batch the squared distance
+            # to every face vert and take the closest
+            vert_count = len(face.verts)
+            vert_co = numpy.fromiter((el for vertex in face.verts for el in vertex.co),
+                                     dtype=numpy.float64, count=vert_count * 3).reshape(-1, 3)
+            vert_co -= (location.x, location.y, location.z)
+            closest_vtx = int(numpy.einsum('ij,ij->i', vert_co, vert_co).argmin())
             # convert back to world space
-            if closest_vtx != -1:
-                scene.cursor.location = matrix @ face.verts[closest_vtx].co
+            scene.cursor.location = matrix @ face.verts[closest_vtx].co
 
             # If find face tile button pressed, set work plane normal too
             if check_modifier:
@@ -1733,7 +1728,8 @@ class UTIL_OP_SprytileTilePicker(bpy.types.Operator):
 
         work_layer_mask = get_work_layer_data(context.scene.sprytile_data)
         location, normal, face_index, distance = sprytile_modal.VIEW3D_OP_SprytileModalTool.raycast_object(context.object, ray_origin,
-                                                                     ray_vector, work_layer_mask=work_layer_mask)
+                                                                     ray_vector, work_layer_mask=work_layer_mask,
+                                                                     tree=self.tree)
         if location is None:
             return None
 
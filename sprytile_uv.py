@@ -1,6 +1,7 @@
 import math
 
 import bmesh
+import numpy
 from mathutils import Vector, Matrix
 
 import sprytile_utils
@@ -21,76 +22,150 @@ class UvDataLayers:
                    WORK_LAYER]
 
 
-def get_uv_pos_size(data, image_size, target_grid, origin_xy, size_x, size_y,
-                    up_vector, right_vector, verts, vtx_center):
+# Material slot lookups by name scan every slot with a string compare;
+# cache the slot index per object/material and just validate it on use
+_mat_slot_cache = {}
+
+
+def get_material_slot_index(obj, mat_id):
+    """Get the material slot index of mat_id on obj, cached between calls"""
+    key = (obj.name, mat_id)
+    mat_idx = _mat_slot_cache.get(key)
+    if mat_idx is not None and mat_idx < len(obj.material_slots) \
+            and obj.material_slots[mat_idx].name == mat_id:
+        return mat_idx
+    mat_idx = obj.material_slots.find(mat_id)
+    if mat_idx > -1:
+        _mat_slot_cache[key] = mat_idx
+    return mat_idx
+
+
+# Cache of UV transform values derived from grid/image settings.
+# These stay constant for every face painted in a stroke, so memoize
+# them instead of crossing into RNA and rebuilding matrices per face
+_uv_transform_cache = {}
+_uv_transform_cache_max = 128
+
+
+def get_uv_transform(data, image_size, target_grid, origin_xy, size_x, size_y):
+    """Get the memoized UV unit sizes, world conversion and uv matrix
+    for the given grid/image settings"""
+    # Read the RNA values once, they are needed for the cache key anyway
+    grid_x, grid_y = target_grid.grid[0], target_grid.grid[1]
+    pad_x, pad_y = target_grid.padding[0], target_grid.padding[1]
+    margin = (target_grid.margin[0], target_grid.margin[1],
+              target_grid.margin[2], target_grid.margin[3])
+    offset_x, offset_y = target_grid.offset[0], target_grid.offset[1]
+    rotate = target_grid.rotate
+    world_units = data.world_pixels
+
+    pad_offset = target_grid.auto_pad_offset
+    if target_grid.auto_pad is False:
+        pad_offset = 0
+
+    cache_key = (image_size[0], image_size[1],
+                 origin_xy[0], origin_xy[1], size_x, size_y,
+                 grid_x, grid_y, pad_x, pad_y, margin,
+                 offset_x, offset_y, rotate,
+                 world_units, pad_offset)
+
+    cached = _uv_transform_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     pixel_uv_x = 1.0 / image_size[0]
     pixel_uv_y = 1.0 / image_size[1]
 
     uv_unit_x = pixel_uv_x * size_x
     uv_unit_y = pixel_uv_y * size_y
 
-    world_units = data.world_pixels
     world_convert = Vector((size_x / world_units,
                             size_y / world_units))
 
     # Build the translation matrix
-    offset_matrix = Matrix.Translation((target_grid.offset[0] * pixel_uv_x, target_grid.offset[1] * pixel_uv_y, 0))
-    rotate_matrix = Matrix.Rotation(target_grid.rotate, 4, 'Z')
+    offset_matrix = Matrix.Translation((offset_x * pixel_uv_x, offset_y * pixel_uv_y, 0))
+    rotate_matrix = Matrix.Rotation(rotate, 4, 'Z')
 
-    origin_x = target_grid.grid[0] + (target_grid.padding[0] * 2) + target_grid.margin[1] + target_grid.margin[3]
+    origin_x = grid_x + (pad_x * 2) + margin[1] + margin[3]
     origin_x *= origin_xy[0]
-    origin_x += target_grid.padding[0]
+    origin_x += pad_x
     origin_x = pixel_uv_x * origin_x
 
-    origin_y = target_grid.grid[1] + (target_grid.padding[1] * 2) + target_grid.margin[0] + target_grid.margin[2]
+    origin_y = grid_y + (pad_y * 2) + margin[0] + margin[2]
     origin_y *= origin_xy[1]
-    origin_y += target_grid.padding[1]
+    origin_y += pad_y
     origin_y = pixel_uv_y * origin_y
     origin_matrix = Matrix.Translation((origin_x, origin_y, 0))
 
     uv_matrix = offset_matrix @ rotate_matrix @ origin_matrix
 
+    pad_scale = Vector(((size_x - pad_offset) / size_x, (size_y - pad_offset) / size_y))
+
+    if len(_uv_transform_cache) >= _uv_transform_cache_max:
+        _uv_transform_cache.clear()
+    # The trailing dict holds specialized projection closures per flip
+    # setting, built lazily and evicted together with this entry
+    cached = (pixel_uv_x, pixel_uv_y, uv_unit_x, uv_unit_y,
+              world_convert, uv_matrix, pad_scale, {})
+    _uv_transform_cache[cache_key] = cached
+    return cached
+
+
+def build_uv_projector(uv_unit_x, uv_unit_y, world_convert, uv_matrix, pad_scale,
+                       flip_x, flip_y):
+    """Build a projection function specialized for one grid/flip setup,
+    with every constant bound as a closure local"""
+    scale_x = (flip_x * pad_scale.x * uv_unit_x) / world_convert.x
+    scale_y = (flip_y * pad_scale.y * uv_unit_y) / world_convert.y
+    rotate_2d = numpy.array(((uv_matrix[0][0], uv_matrix[0][1]),
+                             (uv_matrix[1][0], uv_matrix[1][1])))
+    rotate_2d_t = rotate_2d.T
+    translate = rotate_2d @ (0.5 * uv_unit_x, 0.5 * uv_unit_y)
+    translate += (uv_matrix[0][3], uv_matrix[1][3])
+    array = numpy.array
+    fromiter = numpy.fromiter
+    float64 = numpy.float64
+
+    def project(up_vector, right_vector, verts, vtx_center):
+        project_mtx = array((
+            (right_vector.x * scale_x, right_vector.y * scale_x, right_vector.z * scale_x),
+            (up_vector.x * scale_y, up_vector.y * scale_y, up_vector.z * scale_y)
+        ))
+        vert_array = fromiter((co for vert in verts for co in vert),
+                              dtype=float64, count=len(verts) * 3).reshape(-1, 3)
+        vert_array -= (vtx_center.x, vtx_center.y, vtx_center.z)
+        return (vert_array @ project_mtx.T) @ rotate_2d_t + translate
+
+    return project
+
+
+def get_uv_pos_size(data, image_size, target_grid, origin_xy, size_x, size_y,
+                    up_vector, right_vector, verts, vtx_center):
+    pixel_uv_x, pixel_uv_y, uv_unit_x, uv_unit_y, \
+        world_convert, uv_matrix, pad_scale, projectors = get_uv_transform(data, image_size, target_grid,
+                                                                           origin_xy, size_x, size_y)
+
     flip_x = -1 if data.uv_flip_x else 1
     flip_y = -1 if data.uv_flip_y else 1
-    flip_matrix = Matrix.Scale(flip_x, 4, right_vector) @ Matrix.Scale(flip_y, 4, up_vector)
 
-    pad_offset = target_grid.auto_pad_offset
-    if target_grid.auto_pad is False:
-        pad_offset = 0
-    pad_scale = Vector(((size_x - pad_offset) / size_x, (size_y - pad_offset) / size_y))
-    pad_matrix = Matrix.Scale(pad_scale.x, 4, right_vector) @ Matrix.Scale(pad_scale.y, 4, up_vector)
-
-    uv_min = Vector((float('inf'), float('inf')))
-    uv_max = Vector((float('-inf'), float('-inf')))
-
-    uv_verts = []
-    for vert in verts:
-        # Around center
-        vert_pos = vert - vtx_center
-        # Apply flip scaling
-        vert_pos = flip_matrix @ vert_pos
-        # Apply padding
-        vert_pos = pad_matrix @ vert_pos
-        # Get x/y values by using the right/up vectors
-        vert_xy = (right_vector.dot(vert_pos), up_vector.dot(vert_pos), 0)
-        vert_xy = Vector(vert_xy)
-        # Convert to -0.5 to 0.5 space
-        vert_xy.x /= world_convert.x
-        vert_xy.y /= world_convert.y
-        # Offset by half, to move coordinates back into 0-1 range
-        vert_xy += Vector((0.5, 0.5, 0))
-        # Multiply by the uv unit sizes to get actual UV space
-        vert_xy.x *= uv_unit_x
-        vert_xy.y *= uv_unit_y
-        # Then offset the actual UV space by the translation matrix
-        vert_xy = uv_matrix @ vert_xy
-        # Record min/max for tile alignment step
-        uv_min.x = min(uv_min.x, vert_xy.x)
-        uv_min.y = min(uv_min.y, vert_xy.y)
-        uv_max.x = max(uv_max.x, vert_xy.x)
-        uv_max.y = max(uv_max.y, vert_xy.y)
-        # Save to uv verts
-        uv_verts.append(vert_xy)
+    # Project all verts into UV space with one batched affine transform,
+    # instead of Vector/Matrix math per vertex. The flip and padding
+    # scales collapse into the right/up projection rows because they
+    # scale along those same (orthonormal) axes; the projector closure
+    # has all the per-grid constants prebound
+    projector = projectors.get((flip_x, flip_y))
+    if projector is None:
+        projector = build_uv_projector(uv_unit_x, uv_unit_y, world_convert,
+                                       uv_matrix, pad_scale, flip_x, flip_y)
+        projectors[(flip_x, flip_y)] = projector
+
+    uv_array = projector(up_vector, right_vector, verts, vtx_center)
+
+    # Record min/max for tile alignment step
+    uv_min = Vector((uv_array[:, 0].min(), uv_array[:, 1].min()))
+    uv_max = Vector((uv_array[:, 0].max(), uv_array[:, 1].max()))
+
+    uv_verts = [Vector((uv[0], uv[1], 0.0)) for uv in uv_array]
 
     # In paint mode, do alignment and stretching steps
     if data.paint_mode == 'PAINT':
@@ -258,7 +333,10 @@ def uv_map_face(context, up_vector, right_vector, tile_xy, origin_xy, face_index
     grid_id = obj.sprytile_gridid
     target_grid = sprytile_utils.get_grid(context, grid_id)
 
-    uv_layer = mesh.loops.layers.uv.verify()
+    # Layers are verified at bmesh creation time, only build when missing
+    uv_layer = mesh.loops.layers.uv.active
+    if uv_layer is None:
+        uv_layer = mesh.loops.layers.uv.verify()
 
     if face_index >= len(mesh.faces):
         return None, None
@@ -271,11 +349,12 @@ def uv_map_face(context, up_vector, right_vector, tile_xy, origin_xy, face_index
     if face.hide:
         return None, None
 
-    vert_origin = context.object.matrix_world @ face.calc_center_bounds()
+    matrix_world = obj.matrix_world
+    vert_origin = matrix_world @ face.calc_center_bounds()
     verts = []
     for loop in face.loops:
         vert = loop.vert
-        verts.append(context.object.matrix_world @ vert.co)
+        verts.append(matrix_world @ vert.co)
 
     tile_start = [tile_xy[0], tile_xy[1]]
     if tile_size[0] > 1 or tile_size[1] > 1:
@@ -308,7 +387,9 @@ def apply_uvs(context, face, uv_verts, target_grid,
               uv_layer=None, origin_xy=None):
 
     if uv_layer is None:
-        uv_layer = mesh.loops.layers.uv.verify()
+        uv_layer = mesh.loops.layers.uv.active
+        if uv_layer is None:
+            uv_layer = mesh.loops.layers.uv.verify()
 
     # Apply the UV positions on the face verts
     idx = 0
@@ -317,7 +398,7 @@ def apply_uvs(context, face, uv_verts, target_grid,
         idx += 1
 
     # Apply the correct material to the face
-    mat_idx = context.object.material_slots.find(target_grid.mat_id)
+    mat_idx = get_material_slot_index(context.object, target_grid.mat_id)
     if mat_idx > -1:
         face.material_index = mat_idx
 
@@ -331,7 +412,6 @@ def apply_uvs(context, face, uv_verts, target_grid,
     paint_settings_id = mesh.faces.layers.int.get(UvDataLayers.PAINT_SETTINGS)
     work_layer_id = mesh.faces.layers.int.get(UvDataLayers.WORK_LAYER)
 
-    face = mesh.faces[face.index]
     row_size = math.ceil(target_img.size[0] / target_grid.grid[0])
     tile_id = (tile_xy[1] * row_size) + tile_xy[0]
     origin_id = tile_id
@@ -352,8 +432,10 @@ def apply_uvs(context, face, uv_verts, target_grid,
     face[paint_settings_id] = paint_settings
     face[work_layer_id] = work_layer_data
 
-    bmesh.update_edit_mesh(context.object.data)
-    mesh.faces.index_update()
+    # UV/layer writes don't reorder faces, no index update needed.
+    # They don't change geometry either, so skip the tessellation
+    # recalc and destructive bookkeeping on the edit mesh update
+    bmesh.update_edit_mesh(context.object.data, False, False)
 
     return face.index, target_grid
 